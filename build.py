@@ -7,7 +7,9 @@ Requirements:
 - PyInstaller: pip install pyinstaller
 
 Usage:
-    python build.py
+    python build.py            # single-file executable
+    python build.py --onedir   # folder build, starts faster
+    python build.py --profile-imports   # list the slowest imports first
 """
 
 import os
@@ -16,6 +18,48 @@ import platform
 import subprocess
 import shutil
 
+# Modules PyInstaller would otherwise bundle but the app never imports
+EXCLUDED_MODULES = [
+    'tkinter.test',
+    'test',
+    'unittest',
+    'pydoc_data',
+    'setuptools',
+    'pip',
+    'numpy',
+    'pandas',
+]
+
+def profile_imports(limit=20):
+    """Print the slowest imports pulled in by main.py and its AI client"""
+    print("\n⏱️  Profiling imports (python -X importtime)...")
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main, groq'],
+        stderr=subprocess.PIPE,
+        text=True,
+        close_fds=False
+    )
+    
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        timings.append((int(fields[0]), int(fields[1]), fields[2].strip()))
+    
+    if not timings:
+        print("   No import timings captured:")
+        print(result.stderr.strip())
+        return
+    
+    print(f"\n   {'self (ms)':>10} {'total (ms)':>11}  module")
+    for self_us, cumulative_us, module in sorted(timings, reverse=True)[:limit]:
+        print(f"   {self_us / 1000:>10.1f} {cumulative_us / 1000:>11.1f}  {module}")
+    
+    print("\n   Add unused heavy modules to EXCLUDED_MODULES (--exclude-module) to slim the bundle.")
+
 def main():
     print("=" * 60)
     print("AI Terminal Assistant - Build Script")
@@ -29,29 +73,40 @@ def main():
         print("Install it with: pip install pyinstaller")
         sys.exit(1)
     
+    if '--profile-imports' in sys.argv:
+        profile_imports()
+    
     print("\n📦 Building standalone executable...")
     
+    # --onedir skips the per-launch self-extraction of --onefile, for faster startup
+    onedir = '--onedir' in sys.argv
+    
     cmd = [
         'pyinstaller',
-        '--onefile',
+        '--onedir' if onedir else '--onefile',
         '--windowed',
         '--name=AITerminal',
-        'main.py'
     ]
+    cmd += [f'--exclude-module={module}' for module in EXCLUDED_MODULES]
+    if os_name != 'Windows':
+        cmd.append('--strip')
+    cmd.append('main.py')
     
     print(f"Running: {' '.join(cmd)}")
     
     try:
-        result = subprocess.run(cmd, check=True)
+        # close_fds=False lets CPython use posix_spawn() instead of fork+exec
+        result = subprocess.run(cmd, check=True, close_fds=False)
         
         print("\n✅ Build successful!")
         print("\n📁 Output locations:")
         
+        dist_dir = os.path.join('dist', 'AITerminal') if onedir else 'dist'
         if os_name == 'Windows':
-            exe_path = os.path.join('dist', 'AITerminal.exe')
+            exe_path = os.path.join(dist_dir, 'AITerminal.exe')
             print(f"   Windows executable: {exe_path}")
         else:
-            exe_path = os.path.join('dist', 'AITerminal')
+            exe_path = os.path.join(dist_dir, 'AITerminal')
             print(f"   Linux/Mac executable: {exe_path}")
             
             os.chmod(exe_path, 0o755)
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
 import os
 import sys
 import platform
@@ -8,29 +7,325 @@ import threading
 import queue
 import re
 import json
+import codecs
+import time
+import hashlib
+import sqlite3
+import tempfile
+import logging
+import contextlib
+import functools
+import importlib.util
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
 from pathlib import Path
 from datetime import datetime
-from groq import Groq
+
+logger = logging.getLogger(__name__)
 
 IS_WINDOWS = platform.system() == 'Windows'
 
-if IS_WINDOWS:
-    try:
-        from winpty import PtyProcess
-        HAS_PTY = True
-    except ImportError:
-        HAS_PTY = False
-        print("Warning: pywinpty not installed. Install with: pip install pywinpty")
-else:
+# ANSI escapes (OSC, CSI, single-char), 8-bit OSC, and numeric progress fragments in one pass
+# The pattern avoids lookaround so it also compiles under RE2
+_ANSI_PATTERN = (
+    r'(?m)\x1B(?:\][^\x07\x1B]*(?:\x07|\x1B\\)|\[[0-?]*[ -/]*[@-~]|[@-Z\\-_])'
+    r'|\x9D[^\x9C]*\x9C'
+    r'|^\d+;\d+;\d+;\d+\s+'
+    r'|\d+;\d+;\d+;\d+\s+[-\\|/]\s+'
+)
+try:
+    # google-re2 guarantees linear-time scanning on huge or hostile PTY dumps
+    import re2
+    _ANSI_RE = re2.compile(_ANSI_PATTERN)
+except Exception:
+    _ANSI_RE = re.compile(_ANSI_PATTERN)
+_strip_ansi = _ANSI_RE.sub
+
+# An escape sequence cut off at the end of a read: lone ESC, CSI without its final byte,
+# or an OSC (7-bit or 8-bit) still waiting for its terminator
+_PARTIAL_ESC_RE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*|\][^\x07]*)?|\x9d[^\x9c]*')
+# Longest unfinished sequence held back for the next read; anything longer is passed through
+_MAX_PENDING_ESC = 4096
+
+# Erase display / erase scrollback, which the widget handles by clearing itself
+_CLEAR_RE = re.compile(r'\x1b\[[23]J')
+
+# Error keywords that trigger AI troubleshooting when no exit status is available
+_ERR_RE = re.compile(r'command not found|no such file|permission denied|error|cannot', re.IGNORECASE)
+# Errors are reported at the end of complete lines, so only the tail of chunks with a newline is scanned
+_ERR_SCAN_TAIL = 1024
+# Minimum seconds between two error analyses
+_ERR_DEBOUNCE = 0.5
+# Output sent with an error analysis; the error itself is at the tail
+_MAX_ERROR_CHARS = 2000
+
+# Bash reports every command's exit status out of band: PROMPT_COMMAND emits a private OSC
+# sequence (removed by the ANSI stripper), so nothing is added to the command line or history
+_EXIT_STATUS_RE = re.compile(r'\x1b\]777;aiterm-status;(\d+)\x07')
+_BASH_RC = r"""[ -f ~/.bashrc ] && . ~/.bashrc
+__aiterm_status() { local s=$?; printf '\033]777;aiterm-status;%d\007' "$s"; return $s; }
+PROMPT_COMMAND="__aiterm_status${PROMPT_COMMAND:+; $PROMPT_COMMAND}"
+"""
+
+_OS_NAME = 'Windows' if IS_WINDOWS else 'Linux'
+
+# System prompts sent with every AI request
+_SUGGEST_SYSTEM_PROMPT = f"""You are a helpful terminal assistant. The user is on {_OS_NAME}.
+When asked for a command, provide ONLY the command itself, nothing else. No explanations, no markdown, just the raw command.
+If the user's request is unclear, provide the most likely command they need.
+
+Examples:
+User: "list files"
+Assistant: ls -la
+
+User: "find large files"
+Assistant: find . -type f -size +100M
+
+User: "check disk space"
+Assistant: df -h"""
+
+_TROUBLESHOOT_SYSTEM_PROMPT = f"""You are a helpful terminal assistant debugging errors. The user is on {_OS_NAME}.
+Analyze the error and provide:
+1. A brief explanation of what went wrong
+2. A suggested fix or corrected command
+3. Keep your response concise and actionable
+
+Format your response as:
+Problem: [brief explanation]
+Solution: [suggested fix or command]"""
+
+# The bare query matches the few-shot examples above; error reports keep labels to separate the parts
+_TROUBLESHOOT_USER_TEMPLATE = "Command executed: {}\n\nError output:\n{}".format
+
+# Palette shared by the AI chat confirm bar and the settings dialog
+_CHAT_BG = '#0a0e27'
+_DIALOG_BG = '#0f0f23'
+_FIELD_BG = '#16213e'
+_TEXT_FG = '#e0e0ff'
+
+# Terminal control characters replayed against the display
+_CRLF_RE = re.compile(r'\r+\n')
+_CTRL_RE = re.compile(r'([\b\x7f]+|\r)')
+
+# Bytes requested per PTY read on POSIX
+_PTY_READ_SIZE = 64 * 1024
+
+# PTY chunks waiting for the UI before the reader thread blocks
+_OUTPUT_QUEUE_SIZE = 256
+
+# Output rendered per display tick; anything beyond waits for the next one
+_MAX_DRAIN_CHARS = 256 * 1024
+
+_PtyProcess = None
+
+
+def _load_pty():
+    """Import the platform PTY backend on first use and cache it"""
+    global _PtyProcess
+    if _PtyProcess is None:
+        try:
+            if IS_WINDOWS:
+                from winpty import PtyProcess
+            else:
+                from ptyprocess import PtyProcessUnicode as PtyProcess
+        except ImportError as e:
+            package = 'pywinpty' if IS_WINDOWS else 'ptyprocess'
+            raise ImportError(f"{package} not installed. Install with: pip install {package}") from e
+        _PtyProcess = PtyProcess
+    return _PtyProcess
+
+
+def __getattr__(name):
+    """Resolve PtyProcess/HAS_PTY lazily on attribute access"""
+    if name == 'PtyProcess':
+        return _load_pty()
+    if name == 'HAS_PTY':
+        try:
+            _load_pty()
+            return True
+        except ImportError:
+            return False
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Lines kept in the AI chat widget
+_MAX_WIDGET_LINES = 5000
+
+# Terminal scrollback: once past the limit, trim back to the lower mark in one delete
+_MAX_SCROLLBACK_LINES = 10000
+_TRIMMED_SCROLLBACK_LINES = 8000
+
+# Text widget indices used on every render and AI chat update
+_END_M1C = f'{tk.END}-1c'
+_END_M2C = f'{tk.END}-2c'
+_END_M1C_LINESTART = f'{tk.END}-1c linestart'
+
+# AI requests remembered across sessions
+_MAX_HISTORY = 500
+
+# Persistent cache entries older than this are ignored
+_CACHE_TTL = 30 * 24 * 3600
+
+# Longest a repeated suggestion request waits on the identical one in flight before asking itself
+_INFLIGHT_WAIT_TIMEOUT = 35.0
+
+# Longest an AI request waits for the startup Groq client to finish connecting
+_GROQ_CONNECT_TIMEOUT = 15.0
+
+# Command suggestions kept in memory in front of the SQLite cache
+_CMD_CACHE_SIZE = 128
+
+# Seconds between streamed AI chat updates (~30 per second)
+_STREAM_FLUSH_INTERVAL = 0.033
+
+
+def _stream_completion(chat_create, system_prompt, user_content, max_tokens, on_delta):
+    """Stream a chat completion through on_delta and return (reply, truncated)"""
+    stream = chat_create(
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ],
+        temperature=0.3,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    parts = []
+    pending = []
+    last_flush = 0.0
+    usage = None
+    finish_reason = None
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if chunk.choices and chunk.choices[0].finish_reason:
+            finish_reason = chunk.choices[0].finish_reason
+        if delta:
+            parts.append(delta)
+            pending.append(delta)
+            # Hand tokens to the UI in frame-sized batches; the first one goes out immediately
+            now = time.monotonic()
+            if now - last_flush >= _STREAM_FLUSH_INTERVAL:
+                on_delta(''.join(pending))
+                pending.clear()
+                last_flush = now
+        x_groq = getattr(chunk, 'x_groq', None)
+        if getattr(x_groq, 'usage', None) is not None:
+            usage = x_groq.usage
+    if pending:
+        on_delta(''.join(pending))
+    reply = ''.join(parts)
+    
+    # The system prompts are byte-identical constants so Groq can serve them from its prompt cache
+    if usage is not None:
+        cached_tokens = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None)
+        logger.debug("Groq usage: %s prompt tokens, %s cached", usage.prompt_tokens, cached_tokens)
+    # Hitting max_tokens leaves a partial reply that must not be run or cached
+    return reply, finish_reason == 'length'
+
+
+def _collapse_cr(text):
+    """Drop text overwritten by a later carriage return on the same line, in one linear pass"""
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if '\r' in line:
+            lines[i] = '\r' + line.rpartition('\r')[2]
+    return '\n'.join(lines)
+
+
+def _cache_hash(text):
+    """Short, fast digest used as a persistent cache key"""
+    return hashlib.blake2b(text.encode('utf-8', 'replace'), digest_size=16).hexdigest()
+
+
+@functools.lru_cache(maxsize=512)
+def _normalize_query(query):
+    """Normalize a request for cache lookups: spacing and trailing ?!. only"""
+    # Case matters to the shell (file names, flags), so it is never folded
+    return ' '.join(query.rstrip(' \t?!.').split())
+
+
+# Prompts and progress redraws repeat the same short escape-laden chunks
+_STRIP_CACHE_MAX_LEN = 4096
+
+
+@functools.lru_cache(maxsize=256)
+def _strip_ansi_cached(text):
+    """Strip ANSI escapes from a short chunk, memoizing repeated prompts"""
+    return _strip_ansi('', text)
+
+
+def _split_partial_escape(text):
+    """Split text into (complete, pending), where pending is an escape sequence cut off by the read"""
+    start = text.rfind('\x1b')
+    if start == -1 and '\x9d' not in text:
+        return text, ''
+    # Inside an unterminated OSC every byte up to BEL/ST belongs to it, including a trailing ESC
+    osc = text.rfind('\x1b]')
+    if osc != -1 and text.find('\x07', osc) == -1 and text.find('\x1b\\', osc) == -1:
+        start = osc
+    osc8 = text.rfind('\x9d')
+    if osc8 > start and text.find('\x9c', osc8) == -1:
+        start = osc8
+    if start == -1 or len(text) - start > _MAX_PENDING_ESC or not _PARTIAL_ESC_RE.fullmatch(text, start):
+        return text, ''
+    return text[:start], text[start:]
+
+
+def _trim_widget(widget, max_lines=_MAX_WIDGET_LINES, keep_lines=None):
+    """Delete the oldest lines of a Text widget once it exceeds max_lines, keeping keep_lines"""
+    lines = int(widget.index(_END_M1C).split('.')[0])
+    if lines > max_lines:
+        excess = lines - (keep_lines or max_lines)
+        widget.delete('1.0', f'{excess + 1}.0')
+
+
+def _build_groq_client(api_key):
+    """Create a Groq client with a keep-alive connection pool shared across requests"""
+    import httpx
+    from groq import Groq
+    
+    return Groq(
+        api_key=api_key,
+        http_client=httpx.Client(
+            # HTTP/2 needs the optional h2 package; HTTP/1.1 keep-alive is used without it
+            http2=importlib.util.find_spec('h2') is not None,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300.0)
+        ),
+        timeout=30.0
+    )
+
+
+def _prewarm_groq():
+    """Import groq in the background so the first AI request doesn't pay for it"""
     try:
-        from ptyprocess import PtyProcessUnicode as PtyProcess
-        HAS_PTY = True
+        import groq  # noqa: F401
     except ImportError:
-        HAS_PTY = False
-        print("Warning: ptyprocess not installed. Install with: pip install ptyprocess")
+        pass
 
 
 class AITerminal:
+    # Escape sequences sent to the PTY for special keys
+    _KEY_MAP = {
+        'BackSpace': '\b' if IS_WINDOWS else '\x7f',
+        'Return': '\n',
+        'Tab': '\t',
+        'Up': '\x1b[A',
+        'Down': '\x1b[B',
+        'Right': '\x1b[C',
+        'Left': '\x1b[D',
+        'Home': '\x1b[H',
+        'End': '\x1b[F',
+        'Delete': '\x1b[3~',
+    }
+    # Control characters sent for Ctrl+<key>
+    _CTRL_MAP = {
+        'c': '\x03',
+        'd': '\x04',
+        'z': '\x1a',
+    }
+    
     def __init__(self, root):
         self.root = root
         self.root.title("✨ AI Terminal Assistant")
@@ -42,34 +337,58 @@ class AITerminal:
         
         # Configuration
         self.config_file = Path.home() / '.ai_terminal_config.json'
+        # The Tk thread and the I/O worker both change and save the config
+        self._config_lock = threading.RLock()
         self.load_config()
         
+        # Persistent AI response cache
+        self.cache_file = Path.home() / '.ai_terminal_cache.db'
+        self._cache_lock = threading.Lock()
+        self.cache_db = self.open_cache_db()
+        
         # API Setup
+        self.groq_client = None
+        # Set once the startup client is installed or has failed; requests made earlier wait on it
+        self._groq_ready = threading.Event()
         self.groq_api_key = self.load_api_key()
         if not self.groq_api_key:
             self.show_api_key_dialog()
-        else:
-            try:
-                self.groq_client = Groq(api_key=self.groq_api_key)
-            except Exception as e:
-                messagebox.showerror("Groq Error", f"Failed to initialize Groq client: {e}")
-                self.groq_client = None
         
         # Terminal setup
-        self.is_windows = platform.system() == 'Windows'
-        self.shell = 'cmd.exe' if self.is_windows else 'bash'
+        self.is_windows = IS_WINDOWS
+        self.shell = 'cmd.exe' if IS_WINDOWS else 'bash'
+        self.write_to_terminal = self._write_win if IS_WINDOWS else self._write_posix
         
         # State management
         self.current_input_line = ""
         self.pending_command = None
         self.last_command = ""
-        self.output_buffer = []
+        self._exit_status_hook = False
+        self._last_error_ts = 0.0
+        self._settings_window = None
+        self._confirm_frame = None
+        self.output_buffer = deque(maxlen=20)
         self.process = None
-        self.command_history = []
+        self.history_file = Path.home() / '.ai_terminal_history'
+        self.command_history = deque(maxlen=_MAX_HISTORY)
+        self.load_history()
         self.history_index = -1
-        
-        # ANSI escape pattern
-        self.ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~]|\][^\x07\x1B]*(?:\x07|\x1B\\))')
+        self._key_buf = []
+        self._flush_scheduled = False
+        self._stream_ids = count()
+        self._ai_edit_depth = 0
+        self._scroll_pending = False
+        
+        # Command suggestions keyed by (OS, normalized query)
+        self._cmd_cache = OrderedDict()
+        self._cmd_cache_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Worker threads for AI requests
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='aiterm')
+        # Single writer so config saves stay ordered
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aiterm-io')
         
         # Theme
         self.current_theme = self.config.get('theme', 'dark')
@@ -98,19 +417,39 @@ class AITerminal:
             }
         }
         
-        if not HAS_PTY:
-            messagebox.showerror(
-                "Missing Dependency",
-                f"PTY library not found.\n"
-                f"Install {'pywinpty' if self.is_windows else 'ptyprocess'} to use terminal features.\n\n"
-                f"Command: pip install {'pywinpty' if self.is_windows else 'ptyprocess'}"
-            )
-        
         self.setup_ui()
         self.start_terminal()
         
         # Keyboard shortcuts
         self.setup_shortcuts()
+        self.root.protocol('WM_DELETE_WINDOW', self._on_close)
+        
+        # Importing groq is slow, so it and the client are built off the Tk thread
+        if self.groq_api_key:
+            self._pool.submit(self._init_groq_client, self.groq_api_key)
+        else:
+            self._pool.submit(_prewarm_groq)
+    
+    def _on_close(self):
+        """Stop background workers and close the window"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._groq_ready.set()
+        # Workers are joined at exit; closing the client aborts open streams and the warm-up request
+        if self.groq_client is not None:
+            try:
+                self.groq_client.close()
+            except Exception as e:
+                print(f"Failed to close Groq client: {e}")
+            self.groq_client = None
+        # A key save may still be queued; write the config here instead of waiting on the worker
+        self._io_executor.shutdown(wait=False)
+        self.save_config()
+        self.save_history()
+        if self.cache_db is not None:
+            with self._cache_lock:
+                self.cache_db.close()
+            self.cache_db = None
+        self.root.destroy()
     
     def load_config(self):
         """Load configuration from file"""
@@ -121,17 +460,49 @@ class AITerminal:
                     self.config = json.load(f)
             except Exception:
                 pass
+        self._config_persisted = dict(self.config)
     
     def save_config(self):
         """Save configuration to file"""
+        with self._config_lock:
+            if self.config == self._config_persisted:
+                return True
+            config = dict(self.config)
+            tmp_name = None
+            try:
+                # Write a sibling temp file and swap it in so a crash never leaves a truncated config
+                with tempfile.NamedTemporaryFile('w', dir=self.config_file.parent,
+                                                 prefix='.ai_terminal_config.', delete=False) as f:
+                    tmp_name = f.name
+                    json.dump(config, f, separators=(',', ':'))
+                os.chmod(tmp_name, 0o600)
+                os.replace(tmp_name, self.config_file)
+                self._config_persisted = config
+                return True
+            except Exception as e:
+                print(f"Failed to save config: {e}")
+                if tmp_name is not None:
+                    with contextlib.suppress(OSError):
+                        os.unlink(tmp_name)
+                return False
+    
+    def load_history(self):
+        """Load AI request history from file"""
+        if self.history_file.exists():
+            try:
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    self.command_history.extend(line for line in f.read().splitlines() if line)
+            except Exception:
+                pass
+    
+    def save_history(self):
+        """Save AI request history to file"""
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f)
-            self.config_file.chmod(0o600)
-            return True
+            with open(self.history_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(f"{query}\n" for query in self.command_history))
+            self.history_file.chmod(0o600)
         except Exception as e:
-            print(f"Failed to save config: {e}")
-            return False
+            print(f"Failed to save history: {e}")
     
     def load_api_key(self):
         """Load API key from environment or config"""
@@ -147,14 +518,57 @@ class AITerminal:
     def save_api_key(self, api_key):
         """Save API key to config"""
         try:
-            self.config['GROQ_API_KEY'] = api_key
-            return self.save_config()
+            with self._config_lock:
+                self.config['GROQ_API_KEY'] = api_key
+                return self.save_config()
         except Exception as e:
             print(f"Failed to save API key: {e}")
             return False
     
+    def open_cache_db(self):
+        """Open the persistent AI response cache"""
+        try:
+            db = sqlite3.connect(self.cache_file, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cmd_cache("
+                "key TEXT PRIMARY KEY, os TEXT, response TEXT, ts REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS err_cache("
+                "cmd_hash TEXT, err_hash TEXT, response TEXT, ts REAL, PRIMARY KEY(cmd_hash, err_hash))"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            print(f"Failed to open AI cache: {e}")
+            return None
+    
+    def cache_lookup(self, sql, params):
+        """Return the cached response matched by sql, or None"""
+        if self.cache_db is None:
+            return None
+        try:
+            with self._cache_lock:
+                row = self.cache_db.execute(sql, (*params, time.time() - _CACHE_TTL)).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            print(f"Failed to read AI cache: {e}")
+            return None
+    
+    def cache_store(self, sql, params):
+        """Write a response to the persistent AI cache"""
+        if self.cache_db is None:
+            return
+        try:
+            with self._cache_lock:
+                self.cache_db.execute(sql, (*params, time.time()))
+                self.cache_db.commit()
+        except sqlite3.Error as e:
+            print(f"Failed to write AI cache: {e}")
+    
     def show_api_key_dialog(self):
         """Show API key setup dialog on first run"""
+        from tkinter import messagebox
         dialog = tk.Toplevel(self.root)
         dialog.title("Welcome to AI Terminal")
         dialog.geometry("600x400")
@@ -278,6 +692,7 @@ class AITerminal:
         
     def setup_ui(self):
         """Setup the user interface"""
+        from tkinter import scrolledtext, font as tkfont
         # Outer frame
         outer_frame = tk.Frame(self.root, bg='#0f0f23')
         outer_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
@@ -369,6 +784,15 @@ class AITerminal:
         font_frame.pack(side=tk.RIGHT, padx=15)
         
         self.font_size = tk.IntVar(value=11)
+        # Named fonts shared by the confirm bar and settings dialog, which are built after startup
+        self.font_title = tkfont.Font(family='Segoe UI', size=18, weight='bold')
+        self.font_section = tkfont.Font(family='Segoe UI', size=11, weight='bold')
+        self.font_button = tkfont.Font(family='Segoe UI', size=10, weight='bold')
+        self.font_body = tkfont.Font(family='Segoe UI', size=10)
+        self.font_small = tkfont.Font(family='Segoe UI', size=9)
+        self.font_mono = tkfont.Font(family='Consolas', size=10)
+        # Named font: resizing updates it in place instead of handing the widget a new spec
+        self.terminal_font = tkfont.Font(family='Consolas', size=self.font_size.get())
         
         tk.Button(
             font_frame,
@@ -403,7 +827,7 @@ class AITerminal:
             terminal_display_frame,
             bg='#0a0e27',
             fg='#00ff88',
-            font=('Consolas', self.font_size.get()),
+            font=self.terminal_font,
             insertbackground='#00ff88',
             wrap=tk.WORD,
             state=tk.NORMAL,
@@ -415,10 +839,11 @@ class AITerminal:
             padx=12,
             pady=12,
             undo=True,
-            maxundo=-1
+            maxundo=1000
         )
         self.terminal_display.pack(fill=tk.BOTH, expand=True)
         self.terminal_display.bind('<KeyPress>', self.handle_key_press)
+        self.terminal_display.bind('<<Paste>>', self.paste_to_terminal)
         
         # AI frame
         ai_frame = tk.Frame(main_container, bg='#1a1a2e', width=550, relief=tk.FLAT, bd=0)
@@ -571,20 +996,22 @@ class AITerminal:
         current = self.font_size.get()
         if current < 20:
             self.font_size.set(current + 1)
-            self.terminal_display.config(font=('Consolas', self.font_size.get()))
+            self.terminal_font.configure(size=current + 1)
     
     def decrease_font(self):
         """Decrease terminal font size"""
         current = self.font_size.get()
         if current > 8:
             self.font_size.set(current - 1)
-            self.terminal_display.config(font=('Consolas', self.font_size.get()))
+            self.terminal_font.configure(size=current - 1)
     
     def toggle_theme(self):
         """Toggle between light and dark theme"""
+        from tkinter import messagebox
         self.current_theme = 'light' if self.current_theme == 'dark' else 'dark'
-        self.config['theme'] = self.current_theme
-        self.save_config()
+        with self._config_lock:
+            self.config['theme'] = self.current_theme
+            self.save_config()
         messagebox.showinfo("Theme", "Theme will be applied on next restart")
     
     def clear_terminal(self):
@@ -594,14 +1021,17 @@ class AITerminal:
     
     def clear_ai_chat(self):
         """Clear AI chat"""
-        self.ai_chat.config(state=tk.NORMAL)
-        self.ai_chat.delete('1.0', tk.END)
-        self.ai_chat.config(state=tk.DISABLED)
-        self.add_ai_message("Chat cleared. How can I help you?", 'system')
+        # The confirm bar lives outside the chat text, so drop it with the suggestion it belongs to
+        self._hide_confirm_frame()
+        self.pending_command = None
+        with self._ai_edit() as chat:
+            chat.delete('1.0', tk.END)
+            self.add_ai_message("Chat cleared. How can I help you?", 'system')
         self.update_status("Chat cleared")
     
     def save_terminal_output(self):
         """Save terminal output to file"""
+        from tkinter import filedialog, messagebox
         filename = filedialog.asksaveasfilename(
             defaultextension=".txt",
             filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
@@ -647,6 +1077,8 @@ Get your Groq API key at:
 https://console.groq.com/keys
         """
         
+        from tkinter import scrolledtext
+        
         help_dialog = tk.Toplevel(self.root)
         help_dialog.title("Help")
         help_dialog.geometry("600x500")
@@ -703,57 +1135,129 @@ https://console.groq.com/keys
         
     def start_terminal(self):
         """Start terminal process"""
-        if not HAS_PTY:
+        from tkinter import messagebox
+        try:
+            PtyProcess = _load_pty()
+        except ImportError:
+            messagebox.showerror(
+                "Missing Dependency",
+                f"PTY library not found.\n"
+                f"Install {'pywinpty' if IS_WINDOWS else 'ptyprocess'} to use terminal features.\n\n"
+                f"Command: pip install {'pywinpty' if IS_WINDOWS else 'ptyprocess'}"
+            )
             return
             
         try:
-            self.output_queue = queue.Queue()
+            self.output_queue = queue.SimpleQueue()
+            self._queue_slots = threading.Semaphore(_OUTPUT_QUEUE_SIZE)
+            self._render_scheduled = threading.Event()
             
-            if self.is_windows:
+            if IS_WINDOWS:
                 self.process = PtyProcess.spawn([self.shell], dimensions=(30, 100))
             else:
-                self.process = PtyProcess.spawn([self.shell, '-i'], dimensions=(30, 100))
+                rc_file = self.write_bash_rc()
+                if rc_file is not None:
+                    self.process = PtyProcess.spawn([self.shell, '--rcfile', str(rc_file), '-i'], dimensions=(30, 100))
+                    self._exit_status_hook = True
+                else:
+                    self.process = PtyProcess.spawn([self.shell, '-i'], dimensions=(30, 100))
+            
+            self.root.bind('<<PtyData>>', self._drain_pty)
             
             self.read_thread = threading.Thread(target=self.read_terminal_output, daemon=True)
             self.read_thread.start()
             
-            self.root.after(100, self.update_terminal_display)
             self.update_status("Terminal started")
         except Exception as e:
             messagebox.showerror("Terminal Error", f"Failed to start terminal: {e}")
             
+    def write_bash_rc(self):
+        """Write the rc file that loads ~/.bashrc and installs the exit status hook"""
+        rc_file = Path.home() / '.ai_terminal_bashrc'
+        try:
+            if not rc_file.exists() or rc_file.read_text() != _BASH_RC:
+                rc_file.write_text(_BASH_RC)
+            return rc_file
+        except Exception as e:
+            print(f"Failed to write shell rc file: {e}")
+            return None
+    
     def read_terminal_output(self):
         """Read terminal output in background thread"""
-        while True:
+        read = self.process.read if IS_WINDOWS else self._pty_reader()
+        pending = ''
+        for reads in count(1):
             try:
-                output = self.process.read()
+                output = read()
+                if not output:
+                    # Backends that return empty reads would otherwise spin this loop
+                    time.sleep(0.001)
+                    continue
+                if reads % 64 == 0:
+                    # Let the Tk thread take the GIL during sustained floods
+                    time.sleep(0)
+                
+                # Hold back an escape sequence split across reads until the rest arrives
+                output, pending = _split_partial_escape(pending + output)
+                if not output:
+                    continue
+                
+                if _CLEAR_RE.search(output):
+                    # Queued in order so the clear never overtakes output that preceded it
+                    self._queue_slots.acquire()
+                    self.output_queue.put(None)
                 
-                if '\x1b[2J' in output or '\x1b[H\x1b[2J' in output or '\x1b[3J' in output:
-                    self.root.after(0, self.clear_terminal_screen)
+                exit_status = _EXIT_STATUS_RE.search(output) if self._exit_status_hook else None
                 
+                # Strip escapes here so the UI thread only has to insert text
+                output = self.strip_ansi_codes(output)
+                
+                # Blocks when the UI falls behind, which throttles the reader instead of growing memory
+                self._queue_slots.acquire()
                 self.output_queue.put(output)
+                # One pending event is enough: the drain empties the whole queue
+                if not self._render_scheduled.is_set():
+                    self._render_scheduled.set()
+                    self.root.event_generate('<<PtyData>>', when='tail')
                 self.output_buffer.append(output)
                 
-                if len(self.output_buffer) > 100:
-                    self.output_buffer = self.output_buffer[-50:]
-                    
-                if self.last_command and any(error in output.lower() for error in 
-                    ['command not found', 'no such file', 'permission denied', 'error', 'cannot']):
+                if not self.last_command:
+                    continue
+                if self._exit_status_hook:
+                    # stdout and stderr share the PTY, so trust the exit status over keywords
+                    if exit_status:
+                        if exit_status.group(1) != '0':
+                            self.detect_error()
+                        else:
+                            self.last_command = ""
+                elif '\n' in output and _ERR_RE.search(output, max(0, len(output) - _ERR_SCAN_TAIL)):
                     self.detect_error()
             except EOFError:
                 break
             except Exception:
                 break
                 
+    def _pty_reader(self):
+        """Return a reader that pulls up to 64 KiB per syscall straight from the PTY fd"""
+        fd = self.process.fd
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        def read():
+            data = os.read(fd, _PTY_READ_SIZE)
+            if not data:
+                raise EOFError
+            return decoder.decode(data)
+        
+        return read
+    
     def strip_ansi_codes(self, text):
         """Remove ANSI escape codes from text"""
-        cleaned = self.ansi_escape.sub('', text)
-        cleaned = re.sub(r'\x1B\][^\x07\x1B]*(?:\x07|\x1B\\)', '', cleaned)
-        cleaned = re.sub(r'\x9D[^\x9C]*\x9C', '', cleaned)
-        cleaned = re.sub(r'^\d+;\d+;\d+;\d+\s+', '', cleaned, flags=re.MULTILINE)
-        cleaned = re.sub(r'\d+;\d+;\d+;\d+\s+[-\\|/]\s+', '', cleaned)
-        cleaned = re.sub(r'^\d+;[^\n\r]+?(?=\n|\r|$)', '', cleaned, flags=re.MULTILINE)
-        return cleaned
+        # Plain output (no ESC, 8-bit OSC or numeric fragment) skips the regex entirely
+        if '\x1b' not in text and '\x9d' not in text and ';' not in text:
+            return text
+        if len(text) < _STRIP_CACHE_MAX_LEN:
+            return _strip_ansi_cached(text)
+        return _strip_ansi('', text)
     
     def clear_terminal_screen(self):
         """Clear terminal screen"""
@@ -761,109 +1265,168 @@ https://console.groq.com/keys
     
     def update_terminal_display(self):
         """Update terminal display with new output"""
+        parts = []
+        size = 0
+        cleared = False
         try:
-            while True:
-                output = self.output_queue.get_nowait()
-                clean_output = self.strip_ansi_codes(output)
-                
-                i = 0
-                while i < len(clean_output):
-                    char = clean_output[i]
-                    
-                    if char == '\b' or char == '\x7f':
-                        current_content = self.terminal_display.get('1.0', tk.END)
-                        if len(current_content) > 1:
-                            self.terminal_display.delete(f"{tk.END}-2c")
-                    elif char == '\r':
-                        if i + 1 < len(clean_output) and clean_output[i + 1] == '\n':
-                            pass
-                        else:
-                            current_line_start = self.terminal_display.index(f"{tk.END} linestart")
-                            self.terminal_display.delete(current_line_start, f"{tk.END}-1c")
-                    else:
-                        self.terminal_display.insert(tk.END, char)
-                    
-                    i += 1
-                
-                self.terminal_display.see(tk.END)
+            while size < _MAX_DRAIN_CHARS:
+                part = self.output_queue.get_nowait()
+                self._queue_slots.release()
+                if part is None:
+                    # Screen clear: anything drained before it would be wiped anyway
+                    parts.clear()
+                    cleared = True
+                    continue
+                parts.append(part)
+                size += len(part)
         except queue.Empty:
             pass
-        finally:
-            self.root.after(50, self.update_terminal_display)
+        else:
+            # Flood: render this slice now and come back for the rest after Tk catches up
+            self._render_scheduled.set()
+            self.root.after(1, self._drain_pty)
+        
+        if cleared:
+            self.clear_terminal_screen()
+        if parts:
+            self._render(''.join(parts))
+    
+    def _render(self, clean_output):
+        """Insert cleaned PTY output into the terminal display"""
+        if '\r' in clean_output:
+            clean_output = _collapse_cr(_CRLF_RE.sub('\n', clean_output))
+        
+        # Even items are plain text, odd items are backspace runs or lone carriage returns
+        for i, part in enumerate(_CTRL_RE.split(clean_output)):
+            if not part:
+                continue
+            if i % 2 == 0:
+                self.terminal_display.insert(tk.END, part)
+            elif part == '\r':
+                self.terminal_display.delete(_END_M1C_LINESTART, _END_M1C)
+            else:
+                self.terminal_display.delete(f"end-{len(part) + 1}c", _END_M1C)
+        
+        _trim_widget(self.terminal_display, _MAX_SCROLLBACK_LINES, _TRIMMED_SCROLLBACK_LINES)
+        self.terminal_display.see(tk.END)
+    
+    def _drain_pty(self, event=None):
+        """Render PTY output as soon as the reader thread signals new data"""
+        self._render_scheduled.clear()
+        self.update_terminal_display()
             
     def handle_key_press(self, event):
         """Handle key press events in terminal"""
-        if event.keysym == 'BackSpace':
-            if self.is_windows:
-                self.write_to_terminal('\b')
-            else:
-                self.write_to_terminal('\x7f')
-        elif event.keysym == 'Return':
-            self.write_to_terminal('\n')
-        elif event.keysym == 'Tab':
-            self.write_to_terminal('\t')
-        elif event.keysym == 'Up':
-            self.write_to_terminal('\x1b[A')
-        elif event.keysym == 'Down':
-            self.write_to_terminal('\x1b[B')
-        elif event.keysym == 'Right':
-            self.write_to_terminal('\x1b[C')
-        elif event.keysym == 'Left':
-            self.write_to_terminal('\x1b[D')
-        elif event.keysym == 'Home':
-            self.write_to_terminal('\x1b[H')
-        elif event.keysym == 'End':
-            self.write_to_terminal('\x1b[F')
-        elif event.keysym == 'Delete':
-            self.write_to_terminal('\x1b[3~')
-        elif event.state & 0x4 and event.keysym == 'c':
-            if event.state & 0x1:
-                return None
-            try:
-                if self.terminal_display.tag_ranges(tk.SEL):
+        seq = self._KEY_MAP.get(event.keysym)
+        if seq is None and event.state & 0x4:
+            if event.keysym == 'c':
+                # Leave Ctrl+Shift+C and Ctrl+C on a selection to the copy binding
+                if event.state & 0x1:
                     return None
-            except:
-                pass
-            self.write_to_terminal('\x03')
-        elif event.state & 0x4 and event.keysym == 'd':
-            self.write_to_terminal('\x04')
-        elif event.state & 0x4 and event.keysym == 'z':
-            self.write_to_terminal('\x1a')
-        elif event.state & 0x4 and event.keysym == 'l':
-            return None  # Let our shortcut handler deal with it
-        elif event.char:
-            self.write_to_terminal(event.char)
-        else:
-            return None
+                try:
+                    if self.terminal_display.tag_ranges(tk.SEL):
+                        return None
+                except:
+                    pass
+            elif event.keysym == 'v':
+                return self.paste_to_terminal()
+            elif event.keysym == 'l':
+                return None  # Let our shortcut handler deal with it
+            seq = self._CTRL_MAP.get(event.keysym)
+        if seq is None:
+            if not event.char:
+                return None
+            seq = event.char
+        self._queue_keys(seq)
         return 'break'
                 
-    def write_to_terminal(self, data):
+    def _queue_keys(self, data):
+        """Buffer terminal input and flush it in one write when Tk is idle"""
+        self._key_buf.append(data)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.root.after_idle(self._flush_keys)
+    
+    def _flush_keys(self):
+        """Write buffered terminal input to the PTY"""
+        self._flush_scheduled = False
+        data = ''.join(self._key_buf)
+        self._key_buf.clear()
+        if data:
+            self.write_to_terminal(data)
+    
+    def paste_to_terminal(self, event=None):
+        """Send clipboard contents to the terminal as a single write"""
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return 'break'
+        self._queue_keys(text.replace('\r\n', '\n'))
+        return 'break'
+    
+    def _write_win(self, data):
+        """Write data to terminal, translating newlines for ConPTY"""
+        if self.process:
+            self.process.write(data.replace('\n', '\r\n'))
+            
+    def _write_posix(self, data):
         """Write data to terminal"""
         if self.process:
-            if self.is_windows:
-                data = data.replace('\n', '\r\n')
             self.process.write(data)
             
-    def add_ai_message(self, message, tag='ai'):
-        """Add message to AI chat"""
-        self.ai_chat.config(state=tk.NORMAL)
-        
-        # Add timestamp for user messages
-        if tag == 'user':
-            timestamp = datetime.now().strftime('%H:%M:%S')
-            self.ai_chat.insert(tk.END, f"[{timestamp}] ", 'timestamp')
-        
-        self.ai_chat.insert(tk.END, f"{message}\n", tag)
+    def add_ai_message(self, message, tag='ai', mark=None):
+        """Add message to AI chat, optionally setting mark at the start of its line"""
+        with self._ai_edit() as chat:
+            if mark is not None:
+                # Left gravity keeps the mark in front of the text inserted after it
+                chat.mark_set(mark, _END_M1C)
+                chat.mark_gravity(mark, tk.LEFT)
+            # Add timestamp for user messages, in the same insert call as the text
+            if tag == 'user':
+                timestamp = datetime.now().strftime('%H:%M:%S')
+                chat.insert(tk.END, f"[{timestamp}] ", 'timestamp', f"{message}\n", tag)
+            else:
+                chat.insert(tk.END, f"{message}\n", tag)
+    
+    @contextlib.contextmanager
+    def _ai_edit(self):
+        """Make the AI chat editable for a batch of changes, toggling its state only once"""
+        self._ai_edit_depth += 1
+        if self._ai_edit_depth == 1:
+            self.ai_chat.config(state=tk.NORMAL)
+        try:
+            yield self.ai_chat
+        finally:
+            self._ai_edit_depth -= 1
+            if self._ai_edit_depth == 0:
+                _trim_widget(self.ai_chat)
+                self.ai_chat.config(state=tk.DISABLED)
+                self._schedule_scroll()
+    
+    def _schedule_scroll(self):
+        """Scroll the AI chat to the end at most once per frame"""
+        if not self._scroll_pending:
+            self._scroll_pending = True
+            self.root.after(16, self._do_scroll)
+    
+    def _do_scroll(self):
+        """Scroll the AI chat to the end"""
+        self._scroll_pending = False
         self.ai_chat.see(tk.END)
-        self.ai_chat.config(state=tk.DISABLED)
         
     def ask_ai(self):
         """Ask AI for command suggestion"""
         query = self.ai_input.get().strip()
         if not query:
             return
+        
+        # A new request retires the previous suggestion so Execute can't run it under the new reply
+        self._hide_confirm_frame()
+        self.pending_command = None
             
-        if not self.groq_client:
+        # With a saved key the client may still be connecting; the worker waits for it
+        if not self.groq_client and not self.groq_api_key:
+            from tkinter import messagebox
             messagebox.showwarning(
                 "AI Not Available",
                 "Groq API client not initialized. Please set your API key in Settings."
@@ -876,41 +1439,75 @@ https://console.groq.com/keys
         self.history_index = -1
             
         self.ai_input.delete(0, tk.END)
-        self.add_ai_message(f"You: {query}", 'user')
-        self.add_ai_message("⏳ Thinking...", 'system')
-        self.update_status("Processing request...")
+        placeholder = f"placeholder{next(self._stream_ids)}"
+        with self._ai_edit():
+            self.add_ai_message(f"You: {query}", 'user')
+            self.add_ai_message("⏳ Thinking...", 'system', mark=placeholder)
+        self.update_status("Processing request..." if self.groq_client else "Connecting to Groq...")
+        
+        self._pool.submit(self.get_command_suggestion, query, placeholder)
+        
+    def get_command_suggestion(self, query, placeholder):
+        """Get command suggestion from AI, replacing the placeholder line once the reply starts"""
+        mark = f"stream{next(self._stream_ids)}"
+        started = False
+        
+        def on_delta(delta):
+            nonlocal started
+            if not started:
+                started = True
+                self.root.after(0, self._begin_ai_stream, mark, placeholder, "AI: Here's the command:", '  ', 'command')
+            self.root.after(0, self._append_ai_stream, mark, delta, 'command')
+        
+        normalized = _normalize_query(query)
+        cache_key = (_OS_NAME, normalized)
+        db_key = _cache_hash(normalized)
+        
+        # A repeated request waits for the one already in flight and then hits the cache
+        with self._inflight_lock:
+            inflight = self._inflight.get(cache_key)
+            owner = inflight is None
+            if owner:
+                self._inflight[cache_key] = threading.Event()
+        if not owner:
+            inflight.wait(_INFLIGHT_WAIT_TIMEOUT)
         
-        threading.Thread(target=self.get_command_suggestion, args=(query,), daemon=True).start()
-        
-    def get_command_suggestion(self, query):
-        """Get command suggestion from AI"""
         try:
-            os_name = 'Windows' if self.is_windows else 'Linux'
-            system_prompt = f"""You are a helpful terminal assistant. The user is on {os_name}.
-When asked for a command, provide ONLY the command itself, nothing else. No explanations, no markdown, just the raw command.
-If the user's request is unclear, provide the most likely command they need.
-
-Examples:
-User: "list files"
-Assistant: ls -la
-
-User: "find large files"
-Assistant: find . -type f -size +100M
-
-User: "check disk space"
-Assistant: df -h"""
-
-            completion = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User request: {query}"}
-                ],
-                temperature=0.3,
-                max_tokens=200
-            )
+            command = self._cmd_cache_get(cache_key)
+            if command is None:
+                command = self.cache_lookup(
+                    "SELECT response FROM cmd_cache WHERE key = ? AND os = ? AND ts > ?",
+                    (db_key, _OS_NAME)
+                )
+                if command:
+                    self._cmd_cache_put(cache_key, command)
+            
+            truncated = False
+            if command is not None:
+                on_delta(command)
+            else:
+                self._wait_for_groq_client()
+                command, truncated = _stream_completion(
+                    self._chat_create,
+                    _SUGGEST_SYSTEM_PROMPT,
+                    query,
+                    60,
+                    on_delta
+                )
+                command = command.strip()
+                if command and not truncated:
+                    self._cmd_cache_put(cache_key, command)
+                    self.cache_store(
+                        "INSERT OR REPLACE INTO cmd_cache(key, os, response, ts) VALUES (?, ?, ?, ?)",
+                        (db_key, _OS_NAME, command)
+                    )
+            if not started:
+                on_delta('')
             
-            command = completion.choices[0].message.content.strip()
+            if truncated:
+                self.root.after(0, lambda: self.add_ai_message("⚠️ The suggestion was cut off, so it was not offered to run. Try a more specific request.", 'error'))
+                self.root.after(0, lambda: self.update_status("Suggestion incomplete"))
+                return
             
             self.root.after(0, lambda: self.show_command_suggestion(command))
             self.root.after(0, lambda: self.update_status("Command ready"))
@@ -918,32 +1515,66 @@ Assistant: df -h"""
         except Exception as e:
             self.root.after(0, lambda: self.add_ai_message(f"❌ Error: {str(e)}", 'error'))
             self.root.after(0, lambda: self.update_status("Error occurred"))
+        finally:
+            if owner:
+                with self._inflight_lock:
+                    self._inflight.pop(cache_key).set()
+            self.root.after(0, self.ai_chat.mark_unset, mark, placeholder)
+    
+    def _cmd_cache_get(self, key):
+        """Return a cached command suggestion and mark it recently used"""
+        with self._cmd_cache_lock:
+            command = self._cmd_cache.get(key)
+            if command is not None:
+                self._cmd_cache.move_to_end(key)
+            return command
+    
+    def _cmd_cache_put(self, key, command):
+        """Cache a command suggestion, evicting the least recently used past _CMD_CACHE_SIZE"""
+        with self._cmd_cache_lock:
+            self._cmd_cache[key] = command
+            self._cmd_cache.move_to_end(key)
+            if len(self._cmd_cache) > _CMD_CACHE_SIZE:
+                self._cmd_cache.popitem(last=False)
+    
+    def _begin_ai_stream(self, mark, placeholder, header, prefix, tag):
+        """Replace the placeholder line with a header and open a reply for streamed text"""
+        with self._ai_edit() as chat:
+            chat.delete(placeholder, f"{placeholder} +1l")
             
-    def show_command_suggestion(self, command):
-        """Show command suggestion with execute/cancel buttons"""
-        self.ai_chat.config(state=tk.NORMAL)
-        last_line = self.ai_chat.get("end-2l", "end-1l")
-        if "⏳ Thinking..." in last_line:
-            self.ai_chat.delete("end-2l", "end-1l")
-        self.ai_chat.config(state=tk.DISABLED)
-        
-        self.add_ai_message("AI: Here's the command:", 'ai')
-        self.add_ai_message(f"  {command}", 'command')
+            chat.insert(tk.END, f"{header}\n", 'ai')
+            chat.insert(tk.END, f"{prefix}\n", tag)
+            chat.mark_set(mark, _END_M2C)
+            chat.mark_gravity(mark, tk.RIGHT)
+    
+    def _append_ai_stream(self, mark, delta, tag):
+        """Append streamed text to the reply opened at mark"""
+        with self._ai_edit() as chat:
+            chat.insert(mark, delta, tag)
         
+    def show_command_suggestion(self, command):
+        """Show execute/cancel buttons for the streamed command suggestion"""
         self.pending_command = command
         
-        confirm_frame = tk.Frame(self.ai_chat, bg='#0a0e27')
-        self.ai_chat.window_create(tk.END, window=confirm_frame)
+        # One button bar under the chat is shown and hidden instead of rebuilding buttons per suggestion
+        self._get_confirm_frame().pack(side=tk.BOTTOM, fill=tk.X, pady=(8, 0), before=self.ai_chat.frame)
+    
+    def _get_confirm_frame(self):
+        """Build the Execute/Cancel/Copy frame on first use and reuse it afterwards"""
+        if self._confirm_frame is not None:
+            return self._confirm_frame
+        
+        confirm_frame = tk.Frame(self.ai_chat.frame.master, bg=_CHAT_BG)
         
         execute_btn = tk.Button(
             confirm_frame,
             text="✓ Execute",
             bg='#00ff88',
-            fg='#0a0e27',
-            command=lambda: self.execute_pending_command(confirm_frame),
+            fg=_CHAT_BG,
+            command=self.execute_pending_command,
             relief=tk.FLAT,
             cursor='hand2',
-            font=('Segoe UI', 10, 'bold'),
+            font=self.font_button,
             padx=18,
             pady=8
         )
@@ -958,10 +1589,10 @@ Assistant: df -h"""
             text="✗ Cancel",
             bg='#ff6b9d',
             fg='white',
-            command=lambda: self.cancel_pending_command(confirm_frame),
+            command=self.cancel_pending_command,
             relief=tk.FLAT,
             cursor='hand2',
-            font=('Segoe UI', 10, 'bold'),
+            font=self.font_button,
             padx=18,
             pady=8
         )
@@ -976,10 +1607,10 @@ Assistant: df -h"""
             text="📋 Copy",
             bg='#4a4aff',
             fg='white',
-            command=lambda: self.copy_command(command),
+            command=lambda: self.copy_command(self.pending_command or ''),
             relief=tk.FLAT,
             cursor='hand2',
-            font=('Segoe UI', 10, 'bold'),
+            font=self.font_button,
             padx=18,
             pady=8
         )
@@ -989,10 +1620,13 @@ Assistant: df -h"""
         copy_btn.bind('<Enter>', lambda e: copy_btn.config(bg='#6a6aff'))
         copy_btn.bind('<Leave>', lambda e: copy_btn.config(bg='#4a4aff'))
         
-        self.ai_chat.config(state=tk.NORMAL)
-        self.ai_chat.insert(tk.END, "\n")
-        self.ai_chat.see(tk.END)
-        self.ai_chat.config(state=tk.DISABLED)
+        self._confirm_frame = confirm_frame
+        return confirm_frame
+    
+    def _hide_confirm_frame(self):
+        """Hide the confirm frame until the next suggestion"""
+        if self._confirm_frame is not None:
+            self._confirm_frame.pack_forget()
     
     def copy_command(self, command):
         """Copy command to clipboard"""
@@ -1000,105 +1634,130 @@ Assistant: df -h"""
         self.root.clipboard_append(command)
         self.update_status("Command copied to clipboard")
         
-    def execute_pending_command(self, frame):
+    def execute_pending_command(self):
         """Execute pending command"""
         if self.pending_command:
-            frame.destroy()
+            self._hide_confirm_frame()
             self.add_ai_message(f"✅ Executed: {self.pending_command}", 'system')
             
             self.last_command = self.pending_command
-            self.output_buffer = []
+            # The reader thread may be walking the old buffer; swap it rather than clear it in place
+            self.output_buffer = deque(maxlen=20)
             
             try:
                 self.write_to_terminal(self.pending_command + '\n')
                 self.terminal_display.focus_set()
                 self.update_status("Command executed")
             except Exception as e:
+                from tkinter import messagebox
                 messagebox.showerror("Error", f"Failed to execute command: {e}")
                 
             self.pending_command = None
             
-    def cancel_pending_command(self, frame):
+    def cancel_pending_command(self):
         """Cancel pending command"""
-        frame.destroy()
+        self._hide_confirm_frame()
         self.add_ai_message("❌ Command cancelled", 'system')
         self.pending_command = None
         self.update_status("Command cancelled")
         
     def detect_error(self):
         """Detect and analyze errors"""
-        if not self.last_command or not self.groq_client:
+        if not self.last_command or not (self.groq_client or self.groq_api_key):
             return
+        # A multi-line error dump arrives in many chunks; analyze it once
+        now = time.monotonic()
+        if now - self._last_error_ts < _ERR_DEBOUNCE:
+            return
+        self._last_error_ts = now
             
-        error_output = ''.join(self.output_buffer[-20:])
+        error_output = self._tail_output()
+        command = self.last_command
+        placeholder = f"placeholder{next(self._stream_ids)}"
         
-        self.root.after(0, lambda: self.add_ai_message(f"⚠️ Error detected in: {self.last_command}", 'error'))
-        self.root.after(0, lambda: self.add_ai_message("⏳ Analyzing error...", 'system'))
+        self.root.after(0, lambda: self.add_ai_message(f"⚠️ Error detected in: {command}", 'error'))
+        self.root.after(0, lambda: self.add_ai_message("⏳ Analyzing error...", 'system', mark=placeholder))
         self.root.after(0, lambda: self.update_status("Analyzing error..."))
         
-        threading.Thread(
-            target=self.troubleshoot_error,
-            args=(self.last_command, error_output),
-            daemon=True
-        ).start()
+        self._pool.submit(self.troubleshoot_error, command, error_output, placeholder)
         
         self.last_command = ""
         
-    def troubleshoot_error(self, command, error_output):
-        """Troubleshoot command error"""
+    def _tail_output(self, limit=_MAX_ERROR_CHARS):
+        """Return the last limit characters of recent terminal output for error analysis"""
+        # Walk back only as far as needed instead of joining every buffered chunk
+        parts = []
+        size = 0
+        for part in reversed(self.output_buffer):
+            parts.append(part)
+            size += len(part)
+            if size >= limit:
+                break
+        return ''.join(reversed(parts))[-limit:]
+        
+    def troubleshoot_error(self, command, error_output, placeholder):
+        """Troubleshoot command error, replacing the placeholder line once the reply starts"""
+        mark = f"stream{next(self._stream_ids)}"
+        started = False
+        
+        def on_delta(delta):
+            nonlocal started
+            if not started:
+                started = True
+                self.root.after(0, self._begin_ai_stream, mark, placeholder, "🔍 AI Analysis:", '', 'ai')
+            self.root.after(0, self._append_ai_stream, mark, delta, 'ai')
+        
+        cmd_hash = _cache_hash(command)
+        err_hash = _cache_hash(error_output)
         try:
-            os_name = 'Windows' if self.is_windows else 'Linux'
-            system_prompt = f"""You are a helpful terminal assistant debugging errors. The user is on {os_name}.
-Analyze the error and provide:
-1. A brief explanation of what went wrong
-2. A suggested fix or corrected command
-3. Keep your response concise and actionable
-
-Format your response as:
-Problem: [brief explanation]
-Solution: [suggested fix or command]"""
-
-            completion = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Command executed: {command}\n\nError output:\n{error_output}"}
-                ],
-                temperature=0.3,
-                max_tokens=500
+            solution = self.cache_lookup(
+                "SELECT response FROM err_cache WHERE cmd_hash = ? AND err_hash = ? AND ts > ?",
+                (cmd_hash, err_hash)
             )
+            truncated = False
+            if solution is not None:
+                on_delta(solution)
+            else:
+                self._wait_for_groq_client()
+                solution, truncated = _stream_completion(
+                    self._chat_create,
+                    _TROUBLESHOOT_SYSTEM_PROMPT,
+                    _TROUBLESHOOT_USER_TEMPLATE(command, error_output),
+                    500,
+                    on_delta
+                )
+                if solution and not truncated:
+                    self.cache_store(
+                        "INSERT OR REPLACE INTO err_cache(cmd_hash, err_hash, response, ts) VALUES (?, ?, ?, ?)",
+                        (cmd_hash, err_hash, solution)
+                    )
+            if not started:
+                on_delta('')
+            if truncated:
+                self.root.after(0, lambda: self.add_ai_message("⚠️ The analysis was cut off at the length limit.", 'error'))
             
-            solution = completion.choices[0].message.content
-            
-            self.root.after(0, lambda: self.show_troubleshooting_result(solution))
             self.root.after(0, lambda: self.update_status("Error analysis complete"))
             
         except Exception as e:
             self.root.after(0, lambda: self.add_ai_message(f"❌ Failed to analyze: {str(e)}", 'error'))
             self.root.after(0, lambda: self.update_status("Analysis failed"))
-            
-    def show_troubleshooting_result(self, solution):
-        """Show troubleshooting result"""
-        self.ai_chat.config(state=tk.NORMAL)
-        last_line = self.ai_chat.get("end-2l", "end-1l")
-        if "⏳ Analyzing error..." in last_line:
-            self.ai_chat.delete("end-2l", "end-1l")
-        self.ai_chat.config(state=tk.DISABLED)
-        
-        self.add_ai_message(f"🔍 AI Analysis:\n{solution}", 'ai')
+        finally:
+            self.root.after(0, self.ai_chat.mark_unset, mark, placeholder)
     
     def open_settings(self):
         """Open settings dialog"""
+        # The dialog is built once and then hidden/shown on later opens
+        if self._settings_window is not None and self._settings_window.winfo_exists():
+            self._show_settings()
+            return
+        
+        from tkinter import ttk, messagebox
         settings_dialog = tk.Toplevel(self.root)
+        settings_dialog.withdraw()
         settings_dialog.title("⚙ Settings")
         settings_dialog.geometry("650x550")
-        settings_dialog.configure(bg='#0f0f23')
+        settings_dialog.configure(bg=_DIALOG_BG)
         settings_dialog.transient(self.root)
-        settings_dialog.grab_set()
-        
-        center_x = self.root.winfo_x() + (self.root.winfo_width() // 2) - 325
-        center_y = self.root.winfo_y() + (self.root.winfo_height() // 2) - 275
-        settings_dialog.geometry(f"+{center_x}+{center_y}")
         
         header = tk.Frame(settings_dialog, bg='#7b2cbf', height=70)
         header.pack(fill=tk.X)
@@ -1109,21 +1768,21 @@ Solution: [suggested fix or command]"""
             text="⚙ Settings",
             bg='#7b2cbf',
             fg='white',
-            font=('Segoe UI', 18, 'bold'),
+            font=self.font_title,
             pady=20
         )
         title_label.pack()
         
-        content_frame = tk.Frame(settings_dialog, bg='#0f0f23')
+        content_frame = tk.Frame(settings_dialog, bg=_DIALOG_BG)
         content_frame.pack(fill=tk.BOTH, expand=True, padx=25, pady=20)
         
         # API Key section
         api_section = tk.LabelFrame(
             content_frame,
             text="API Configuration",
-            bg='#0f0f23',
-            fg='#e0e0ff',
-            font=('Segoe UI', 11, 'bold'),
+            bg=_DIALOG_BG,
+            fg=_TEXT_FG,
+            font=self.font_section,
             relief=tk.FLAT
         )
         api_section.pack(fill=tk.X, pady=(0, 20))
@@ -1131,9 +1790,9 @@ Solution: [suggested fix or command]"""
         info_label = tk.Label(
             api_section,
             text="Get your free API key at: https://console.groq.com/keys",
-            bg='#0f0f23',
+            bg=_DIALOG_BG,
             fg='#ffd700',
-            font=('Segoe UI', 9),
+            font=self.font_small,
             cursor='hand2'
         )
         info_label.pack(anchor=tk.W, padx=15, pady=(10, 5))
@@ -1142,29 +1801,27 @@ Solution: [suggested fix or command]"""
         key_label = tk.Label(
             api_section,
             text="API Key:",
-            bg='#0f0f23',
-            fg='#e0e0ff',
-            font=('Segoe UI', 10, 'bold')
+            bg=_DIALOG_BG,
+            fg=_TEXT_FG,
+            font=self.font_button
         )
         key_label.pack(anchor=tk.W, padx=15, pady=(10, 5))
         
-        key_container = tk.Frame(api_section, bg='#16213e', highlightthickness=2, 
+        key_container = tk.Frame(api_section, bg=_FIELD_BG, highlightthickness=2, 
                                 highlightbackground='#2a2a4e', highlightcolor='#9d4edd')
         key_container.pack(fill=tk.X, padx=15, pady=(0, 10))
         
         key_entry = tk.Entry(
             key_container,
-            bg='#16213e',
-            fg='#e0e0ff',
-            font=('Consolas', 10),
+            bg=_FIELD_BG,
+            fg=_TEXT_FG,
+            font=self.font_mono,
             insertbackground='#c77dff',
             show='•',
             relief=tk.FLAT,
             borderwidth=0
         )
         key_entry.pack(fill=tk.X, padx=12, pady=10)
-        key_entry.insert(0, self.groq_api_key if self.groq_api_key else '')
-        key_entry.focus_set()
         
         show_var = tk.BooleanVar(value=False)
         
@@ -1176,12 +1833,12 @@ Solution: [suggested fix or command]"""
             text="Show API Key",
             variable=show_var,
             command=toggle_show,
-            bg='#0f0f23',
+            bg=_DIALOG_BG,
             fg='#c77dff',
-            selectcolor='#16213e',
-            activebackground='#0f0f23',
-            activeforeground='#e0e0ff',
-            font=('Segoe UI', 9)
+            selectcolor=_FIELD_BG,
+            activebackground=_DIALOG_BG,
+            activeforeground=_TEXT_FG,
+            font=self.font_small
         )
         show_check.pack(anchor=tk.W, padx=15, pady=(0, 10))
         
@@ -1189,9 +1846,9 @@ Solution: [suggested fix or command]"""
         model_section = tk.LabelFrame(
             content_frame,
             text="Model Settings",
-            bg='#0f0f23',
-            fg='#e0e0ff',
-            font=('Segoe UI', 11, 'bold'),
+            bg=_DIALOG_BG,
+            fg=_TEXT_FG,
+            font=self.font_section,
             relief=tk.FLAT
         )
         model_section.pack(fill=tk.X, pady=(0, 20))
@@ -1199,9 +1856,9 @@ Solution: [suggested fix or command]"""
         tk.Label(
             model_section,
             text="AI Model:",
-            bg='#0f0f23',
-            fg='#e0e0ff',
-            font=('Segoe UI', 10)
+            bg=_DIALOG_BG,
+            fg=_TEXT_FG,
+            font=self.font_body
         ).pack(anchor=tk.W, padx=15, pady=(10, 5))
         
         model_var = tk.StringVar(value="llama-3.3-70b-versatile")
@@ -1210,26 +1867,45 @@ Solution: [suggested fix or command]"""
             textvariable=model_var,
             values=["llama-3.3-70b-versatile", "llama-3.1-70b-versatile", "mixtral-8x7b-32768"],
             state="readonly",
-            font=('Segoe UI', 10)
+            font=self.font_body
         )
         model_dropdown.pack(fill=tk.X, padx=15, pady=(0, 10))
         
+        def show_settings():
+            center_x = self.root.winfo_x() + (self.root.winfo_width() // 2) - 325
+            center_y = self.root.winfo_y() + (self.root.winfo_height() // 2) - 275
+            settings_dialog.geometry(f"+{center_x}+{center_y}")
+            
+            key_entry.delete(0, tk.END)
+            key_entry.insert(0, self.groq_api_key if self.groq_api_key else '')
+            show_var.set(False)
+            toggle_show()
+            
+            settings_dialog.deiconify()
+            settings_dialog.lift()
+            settings_dialog.grab_set()
+            key_entry.focus_set()
+        
+        def hide_settings():
+            settings_dialog.grab_release()
+            settings_dialog.withdraw()
+        
         def save_settings():
             new_key = key_entry.get().strip()
             if new_key and new_key != self.groq_api_key:
                 success = self.update_api_key(new_key)
                 if success:
-                    settings_dialog.destroy()
+                    hide_settings()
                     messagebox.showinfo("Settings Saved", "API key has been updated and saved successfully!")
                 else:
                     messagebox.showerror("Invalid API Key", "Failed to initialize Groq client. Please check your API key.")
             else:
-                settings_dialog.destroy()
+                hide_settings()
         
         def cancel_settings():
-            settings_dialog.destroy()
+            hide_settings()
         
-        button_frame = tk.Frame(content_frame, bg='#0f0f23')
+        button_frame = tk.Frame(content_frame, bg=_DIALOG_BG)
         button_frame.pack(fill=tk.X, pady=(20, 0))
         
         save_button = tk.Button(
@@ -1237,7 +1913,7 @@ Solution: [suggested fix or command]"""
             text="💾 Save & Close",
             bg='#9d4edd',
             fg='white',
-            font=('Segoe UI', 11, 'bold'),
+            font=self.font_section,
             command=save_settings,
             cursor='hand2',
             relief=tk.FLAT,
@@ -1250,8 +1926,8 @@ Solution: [suggested fix or command]"""
             button_frame,
             text="✗ Cancel",
             bg='#2a2a4e',
-            fg='#e0e0ff',
-            font=('Segoe UI', 11, 'bold'),
+            fg=_TEXT_FG,
+            font=self.font_section,
             command=cancel_settings,
             cursor='hand2',
             relief=tk.FLAT,
@@ -1262,39 +1938,108 @@ Solution: [suggested fix or command]"""
         
         key_entry.bind('<Return>', lambda e: save_settings())
         key_entry.bind('<Escape>', lambda e: cancel_settings())
+        settings_dialog.protocol('WM_DELETE_WINDOW', cancel_settings)
+        
+        self._settings_window = settings_dialog
+        self._show_settings = show_settings
+        show_settings()
     
     def open_url(self, url):
         """Open URL in browser"""
         import webbrowser
         webbrowser.open(url)
     
+    def _init_groq_client(self, api_key):
+        """Build the Groq client for the saved API key on a worker and hand it to the Tk thread"""
+        try:
+            client = _build_groq_client(api_key)
+        except Exception as e:
+            self.root.after(0, self._groq_client_failed, e)
+            return
+        self.root.after(0, self._install_groq_client, client, api_key)
+    
+    def _groq_client_failed(self, error):
+        """Report a Groq client that could not be built at startup"""
+        self._groq_ready.set()
+        from tkinter import messagebox
+        messagebox.showerror("Groq Error", f"Failed to initialize Groq client: {error}")
+    
+    def _install_groq_client(self, client, api_key):
+        """Make client the active Groq client unless the key changed meanwhile"""
+        if api_key != self.groq_api_key:
+            client.close()
+            return
+        if self.groq_client is not None:
+            self.groq_client.close()
+        self.groq_client = client
+        self._chat_create = client.chat.completions.create
+        self._groq_ready.set()
+        self._pool.submit(self._warm_groq_connection, client)
+    
+    def _wait_for_groq_client(self):
+        """Block a worker until the startup Groq client is ready, raising if it never arrives"""
+        if self.groq_client is None and not self._groq_ready.wait(_GROQ_CONNECT_TIMEOUT):
+            raise RuntimeError("Still connecting to Groq, please try again in a moment")
+        if self.groq_client is None:
+            raise RuntimeError("Groq API client not initialized. Please check your API key in Settings.")
+    
+    def create_groq_client(self, api_key):
+        """Create the Groq client for api_key and make it the active one"""
+        if self.groq_client is not None:
+            self.groq_client.close()
+            self.groq_client = None
+        self._install_groq_client(_build_groq_client(api_key), api_key)
+    
+    def _warm_groq_connection(self, client):
+        """Open the TLS connection with a cheap request so the first AI query skips the handshake"""
+        try:
+            client.models.list()
+        except Exception as e:
+            logger.debug("Groq warm-up failed: %s", e)
+    
     def update_api_key(self, new_key):
         """Update API key"""
         self.groq_api_key = new_key
         try:
-            self.groq_client = Groq(api_key=new_key)
+            self.create_groq_client(new_key)
             
             os.environ['GROQ_API_KEY'] = new_key
             
-            if self.save_api_key(new_key):
-                self.add_ai_message("✅ API key updated and saved successfully!", 'system')
-                self.update_status("API key updated")
-            else:
-                self.add_ai_message("✅ API key updated for this session (save failed)", 'system')
+            # The client is usable right away; the config write finishes in the background
+            self._api_key_saved(self._io_executor.submit(self.save_api_key, new_key))
             
             return True
         except Exception as e:
             self.groq_client = None
+            self._groq_ready.set()
             self.add_ai_message(f"❌ Failed to initialize Groq client: {str(e)}", 'error')
             return False
+    
+    def _api_key_saved(self, saving):
+        """Report the background API key save once it finishes, polling from the Tk thread"""
+        if not saving.done():
+            self.root.after(50, self._api_key_saved, saving)
+            return
+        if saving.result():
+            self.add_ai_message("✅ API key updated and saved successfully!", 'system')
+            self.update_status("API key updated")
+        else:
+            self.add_ai_message("✅ API key updated for this session (save failed)", 'system')
 
 
 def main():
+    # AITERM_DEBUG=1 prints Groq usage and warm-up failures to stderr
+    if os.environ.get('AITERM_DEBUG'):
+        logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(name)s: %(message)s')
+        # Keep the HTTP client libraries at their usual level so only this module's output shows
+        for name in ('httpx', 'httpcore', 'groq', 'hpack'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+    
     root = tk.Tk()
     
     # Set icon if available
     try:
-        if platform.system() == 'Windows':
+        if IS_WINDOWS:
             root.iconbitmap('icon.ico')
         else:
             icon = tk.PhotoImage(file='icon.png')